@@ -0,0 +1,147 @@
+"""Microbenchmarks for the data functions in app.py against a generated database.
+
+Each read runs cold (empty session query cache) and, where the app caches it, warm. Every run also records
+the rows returned and SQL statements issued, using the app's own instrumentation. Per-user functions run
+for the most active user ("top") and the median user ("typical"); writes use two extra bench users, so the
+generated data is left as it was. Run from the repository root:
+
+    python -m benchmarks.generate_data --expenses 1M --db bench_data/expenses_1M.db
+    python -m benchmarks.bench_data --db bench_data/expenses_1M.db --out bench_results/data_1M.json
+"""
+import argparse
+import io
+import re
+import time
+from datetime import date, timedelta
+
+import streamlit as st
+
+import app
+from benchmarks.common import dataset, environment, save, summarize
+from benchmarks.generate_data import PASSWORD
+
+WRITERS = ("bench_writer_a", "bench_writer_b")
+
+def measure(fn, repeat, warm=False, setup=None, teardown=None):
+    """Time fn() repeat times with cold caches, then once more warm if asked; setup/teardown are not timed."""
+    timings, section = [], None
+    for _ in range(repeat):
+        st.session_state.clear(); app._chart_cache.clear()
+        if setup: setup()
+        start = time.perf_counter()
+        with app.timed("bench") as section:
+            section["rows"] = app._count_rows(result := fn())
+        timings.append(time.perf_counter() - start)
+        if teardown: teardown()
+    stats = {**summarize(timings), "rows": section["rows"], "queries": section["queries"]}
+    if isinstance(result, bytes): stats["bytes"] = len(result)
+    if warm:
+        start = time.perf_counter(); fn()
+        stats["warm_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return stats
+
+def profile_users():
+    with app.read_engine.connect() as conn:
+        ranked = [row[0] for row in conn.execute(app.db.text(
+            "SELECT username FROM user_stats WHERE username LIKE 'user%' ORDER BY expense_count DESC, username"))]
+    return {"top": ranked[0], "typical": ranked[len(ranked) // 2]}
+
+def read_cases(user, peers):
+    """(name, fn, cached, heavy) for every read path a page render can take for this user."""
+    some_id = app.get_expenses_page(user)[0]["id"].iloc[-1]
+    by_category, by_month = app.get_category_totals(user), app.get_monthly_totals(user)
+    csv_upload = "date,amount,category,description\n" + "".join(f"2024-01-{d % 28 + 1:02d},{d}.5,Food,lunch\n" for d in range(1000))
+    return [
+        ("login_user", lambda: app.login_user(user, PASSWORD), False, False),
+        ("get_all_usernames", lambda: app.get_all_usernames(user), True, False),
+        ("view_all_expenses", lambda: app.view_all_expenses(user), True, True),
+        ("get_expenses_page", lambda: app.get_expenses_page(user), True, False),
+        ("get_expenses_page:filtered", lambda: app.get_expenses_page(user, category="Food", start_date=date(2000, 1, 1)), True, False),
+        ("search_expenses", lambda: app.search_expenses(user, "food"), True, False),
+        ("search_expenses:prefix+filtered", lambda: app.search_expenses(user, "tra", min_amount=100.0), True, False),
+        ("get_expense_by_id", lambda: app.get_expense_by_id(int(some_id)), False, False),
+        ("get_user_debts", lambda: app.get_user_debts(user), True, False),
+        ("get_net_balances", lambda: app.get_net_balances(user), True, False),
+        ("compute_settlement_plan", lambda: app.compute_settlement_plan([user, *peers]), False, False),
+        ("get_category_totals", lambda: app.get_category_totals(user), True, False),
+        ("get_monthly_totals", lambda: app.get_monthly_totals(user), True, False),
+        ("render_chart:pie", lambda: app.render_chart(app.plot_expenses_by_category, by_category), False, False),
+        ("render_chart:line", lambda: app.render_chart(app.plot_expenses_over_time, by_month), False, False),
+        ("render_chart:bar", lambda: app.render_chart(app.plot_bar_chart_by_category, by_category), False, False),
+        ("generate_smart_insights", lambda: app.generate_smart_insights(user), True, False),
+        ("get_budget_status", lambda: app.get_budget_status(user), True, False),
+        ("get_user_goals", lambda: app.get_user_goals(user), True, False),
+        ("get_user_badges", lambda: app.get_user_badges(user), True, False),
+        ("check_and_award_badges", lambda: app.check_and_award_badges(user), True, False),
+        ("parse_expenses_csv", lambda: app.parse_expenses_csv(io.BytesIO(csv_upload.encode()))[0], False, False),
+        ("export_to_csv", lambda: app.export_to_csv(user), False, True),
+        ("export_to_excel", lambda: app.export_to_excel(user), False, True),
+        ("export_to_pdf", lambda: app.export_to_pdf(user), False, True),
+    ]
+
+def admin_cases():
+    return [
+        ("view_all_expenses:admin", lambda: app.view_all_expenses("Itachibanker19", is_admin=True), True, True),
+        ("get_expenses_page:admin", lambda: app.get_expenses_page("Itachibanker19", is_admin=True), True, False),
+        ("search_expenses:admin", lambda: app.search_expenses("Itachibanker19", "food", is_admin=True), True, False),
+        ("get_category_totals:admin", lambda: app.get_category_totals("Itachibanker19", is_admin=True), True, False),
+        ("get_monthly_totals:admin", lambda: app.get_monthly_totals("Itachibanker19", is_admin=True), True, False),
+    ]
+
+def write_cases():
+    """(name, fn, setup, teardown): each case cleans up after itself, so repeated runs see the same data."""
+    a, b = WRITERS
+    state = {}
+    def add(): state["id"] = app.add_split_expense(a, date.today(), "Food", 9000, "bench", [b])[0]; return state["id"]
+    def delete(): return app.delete_data(state["id"])
+    def delete_imported():
+        with app.read_engine.connect() as conn:
+            ids = [row[0] for row in conn.execute(app.db.text("SELECT id FROM expenses WHERE user_id = :user"), {"user": app.user_id(a)})]
+        for expense_id in ids: app.delete_data(expense_id)
+    def add_rules():
+        # A year of monthly occurrences for each of 100 rules
+        state["rules"] = [app.add_recurring_rule(a, date.today() - timedelta(days=365), "Bills", 1000 + i, "bench", "monthly") for i in range(100)]
+    def delete_rules():
+        for rule_id in state["rules"]: app.stop_recurring_rule(a, rule_id)
+        delete_imported()
+    return [
+        ("add_split_expense", add, None, delete),
+        ("edit_expense_data", lambda: app.edit_expense_data(state["id"], date.today(), "Bills", 120, "bench"), add, delete),
+        ("settle_all_with", lambda: app.settle_all_with(b, a), add, delete),
+        ("delete_data", delete, add, None),
+        ("import_expenses:1000", lambda: app.import_expenses(a, [(date.today(), "Food", 1000 + i, "bench", []) for i in range(1000)]), None, delete_imported),
+        ("materialize_recurring:100 rules", lambda: app.materialize_recurring(a), add_rules, delete_rules),
+    ]
+
+def run(db_path, repeat=5, repeat_heavy=1, only=None):
+    app.configure_database(url=f"sqlite:///{db_path}")
+    app.migrate(app.engine)
+    for writer in WRITERS:
+        if not app.check_user_exists(writer): app.add_userdata(writer, PASSWORD)
+    selected = lambda name: only is None or re.search(only, name)
+    users = profile_users()
+    results = {"users": users}
+    for profile, user in users.items():
+        peers = [u for u in users.values() if u != user] + list(WRITERS)
+        for name, fn, cached, heavy in read_cases(user, peers):
+            if selected(name): results[f"{name}[{profile}]"] = measure(fn, repeat_heavy if heavy else repeat, warm=cached)
+    for name, fn, cached, heavy in admin_cases():
+        if selected(name): results[name] = measure(fn, repeat_heavy if heavy else repeat, warm=cached)
+    for name, fn, setup, teardown in write_cases():
+        if selected(name): results[name] = measure(fn, repeat, setup=setup, teardown=teardown)
+    app.engine.dispose(); app.read_engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="database made by benchmarks.generate_data")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--repeat-heavy", type=int, default=1, help="runs of the full-table reads and exports")
+    parser.add_argument("--only", help="regex selecting benchmarks by name")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+    results = run(args.db, args.repeat, args.repeat_heavy, args.only)
+    save({"environment": environment(), "dataset": dataset(args.db), "benchmarks": results}, args.out)
+
+if __name__ == "__main__":
+    main()
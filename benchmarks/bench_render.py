@@ -0,0 +1,79 @@
+"""Headless page-render benchmark: every menu page rendered through Streamlit's AppTest.
+
+Logs in as the admin and as the most active generated user, then opens each page twice: cold (first visit
+in the session) and warm (revisit, served from the session's query cache). The SQL statements and SQL time
+of each render come from the app's per-rerun metrics log. Run from the repository root:
+
+    python -m benchmarks.bench_render --db bench_data/expenses_1M.db --out bench_results/render_1M.json
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+from benchmarks.common import REPO, dataset, environment, save, summarize
+from benchmarks.generate_data import PASSWORD
+
+PAGES = ["Add Expense", "Debts", "Summary", "Manage Records", "Budgets & Recurring", "Goals & Achievements"]
+ADMIN = ("Itachibanker19", "Killer1980")
+
+class RerunLog(logging.Handler):
+    """Keeps the JSON record the app logs at the end of every rerun."""
+    def __init__(self):
+        super().__init__(); self.reruns = []
+    def emit(self, record): self.reruns.append(json.loads(record.getMessage()))
+
+def timed_run(at, log, action=None):
+    log.reruns.clear()
+    start = time.perf_counter()
+    (action or at.run)()
+    elapsed = time.perf_counter() - start
+    if at.exception: raise RuntimeError(at.exception[0].message)
+    return elapsed, sum(r["queries"] for r in log.reruns), round(sum(r["query_ms"] for r in log.reruns), 3)
+
+def render_pages(username, password, repeat, log, timeout):
+    from streamlit.testing.v1 import AppTest
+    results = {}
+    for _ in range(repeat):
+        at = AppTest.from_file(os.path.join(REPO, "app.py"), default_timeout=timeout)
+        timings = {"login screen": [timed_run(at, log)]}
+        at.text_input[0].input(username); at.text_input[1].input(password)
+        timings["login"] = [timed_run(at, log, at.button[0].click().run)]
+        for visit in ("cold", "warm"):
+            for page in PAGES:
+                timings.setdefault(f"{page} ({visit})", []).append(timed_run(at, log, at.sidebar.selectbox[0].select(page).run))
+        for name, runs in timings.items():
+            results.setdefault(name, []).extend(runs)
+    return {name: {**summarize([seconds for seconds, _, _ in runs]), "queries": runs[-1][1], "query_ms": runs[-1][2]}
+            for name, runs in results.items()}
+
+def run(db_path, repeat=3, top_user=None, timeout=600):
+    # The app reads its database URL from the environment when its engines are first created
+    os.environ["QUEST_DB_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+    log = RerunLog()
+    metrics_log = logging.getLogger("questfinance.metrics")
+    metrics_log.addHandler(log); metrics_log.setLevel(logging.INFO)
+    if top_user is None:
+        import sqlalchemy as db
+        engine = db.create_engine(os.environ["QUEST_DB_URL"])
+        with engine.connect() as conn:
+            top_user = conn.execute(db.text("SELECT username FROM user_stats WHERE username LIKE 'user%' ORDER BY expense_count DESC LIMIT 1")).scalar()
+        engine.dispose()
+    try:
+        return {"admin": render_pages(*ADMIN, repeat, log, timeout), f"user ({top_user})": render_pages(top_user, PASSWORD, repeat, log, timeout)}
+    finally:
+        metrics_log.removeHandler(log)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="database made by benchmarks.generate_data")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh sessions per user")
+    parser.add_argument("--user", help="generated user to log in as (default: the most active)")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+    results = run(args.db, args.repeat, args.user)
+    save({"environment": environment(), "dataset": dataset(args.db), "renders": results}, args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Cold-start cost: time to the login screen and import cost per top-level module.
+
+Every measurement runs in a fresh interpreter, so nothing is warm from a previous run. Run from the
+repository root:
+
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "matplotlib", "reportlab", "openpyxl"]
+
+# Renders the first page exactly as a new visitor would see it, in a scratch working directory
+LOGIN_SCREEN = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+ready = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+done = time.perf_counter()
+assert not at.exception, at.exception
+print(json.dumps({"login_screen_seconds": done - ready, "apptest_import_seconds": ready - start,
+                  "heavy_modules_loaded": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+def import_costs():
+    """Cumulative import time in ms of each module imported directly by `import app`, from -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=REPO, capture_output=True, text=True, check=True)
+    # Children are printed before their parent, so collect depth-1 entries until the top-level "app" line;
+    # any other top-level line (interpreter start-up imports such as site) starts the collection over
+    costs = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|")
+        name, depth = raw_name.strip(), (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        if depth == 0 and name == "app": return int(cumulative) / 1000, dict(sorted(costs.items(), key=lambda item: -item[1]))
+        if depth == 0: costs = {}
+        elif depth == 1: costs[name] = int(cumulative) / 1000
+    raise RuntimeError("app import not found in -X importtime output")
+
+def login_screen():
+    with tempfile.TemporaryDirectory() as tmp:
+        result = subprocess.run([sys.executable, "-c", LOGIN_SCREEN, os.path.join(REPO, "app.py"), *HEAVY_MODULES],
+                                cwd=tmp, capture_output=True, text=True, check=True, env={**os.environ, "PYTHONPATH": REPO})
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+    imports = [import_costs() for _ in range(args.repeat)]
+    logins = [login_screen() for _ in range(args.repeat)]
+    results = {
+        "import_app_ms": statistics.median(total for total, _ in imports),
+        "import_ms_by_module": {name: round(statistics.median(costs.get(name, 0) for _, costs in imports), 1) for name in imports[0][1]},
+        "login_screen_seconds": round(statistics.median(run["login_screen_seconds"] for run in logins), 3),
+        "heavy_modules_loaded_at_login": logins[-1]["heavy_modules_loaded"],
+    }
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f: json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Shared helpers for the benchmark scripts: timing summaries and JSON result files."""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+import sqlalchemy as db
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TABLES = ["users", "expenses", "debts", "goals", "badges"]
+
+def git_commit():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True, text=True)
+    dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO, capture_output=True, text=True).stdout.strip()
+    return (result.stdout.strip() or "unknown") + ("-dirty" if dirty else "")
+
+def environment():
+    """Where and when the results were taken, so runs from different commits can be told apart."""
+    return {"commit": git_commit(), "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0], "platform": platform.platform(), "cpus": os.cpu_count()}
+
+def dataset(db_path):
+    """Row counts of the benchmarked database."""
+    engine = db.create_engine(f"sqlite:///{db_path}")
+    with engine.connect() as conn:
+        counts = {table: conn.execute(db.text(f"SELECT COUNT(*) FROM {table}")).scalar() for table in TABLES}
+    engine.dispose()
+    return {"db": os.path.abspath(db_path), "rows": counts}
+
+def summarize(seconds):
+    """min/median/mean in ms of a list of timings in seconds."""
+    return {"runs": len(seconds), "min_ms": round(min(seconds) * 1000, 3),
+            "median_ms": round(statistics.median(seconds) * 1000, 3), "mean_ms": round(statistics.fmean(seconds) * 1000, 3)}
+
+def save(results, out):
+    print(json.dumps(results, indent=2))
+    if out:
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, "w") as f: json.dump(results, f, indent=2)
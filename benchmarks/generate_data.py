@@ -0,0 +1,122 @@
+"""Fill a database with synthetic users, expenses, debts, goals and badges for load testing.
+
+Activity is skewed the way real usage is: a few users log most of the expenses (Zipf-distributed), spending
+leans towards Food and Transport, amounts are log-normal and recent months are busier than old ones. Split
+bills go to friends drawn from the same skewed distribution. The output is deterministic for a given --seed.
+Run from the repository root:
+
+    python -m benchmarks.generate_data --expenses 1000000 --db bench_data/expenses_1M.db
+"""
+import argparse
+import bisect
+import itertools
+import json
+import math
+import os
+import random
+import time
+from datetime import date, timedelta
+
+import sqlalchemy as db
+
+from app import BADGE_RULES, CATEGORIES, split_cents
+from create_db import DB_FILE, make_hashes, migrate, rebuild_debt_balances, rebuild_monthly_rollup, rebuild_user_stats
+
+CATEGORY_WEIGHTS = [30, 20, 15, 15, 10, 10]  # same order as CATEGORIES
+GOAL_TARGETS = [5000, 10000, 25000, 50000, 100000]
+PASSWORD = "bench"  # every generated user logs in with this
+TODAY = date(2025, 1, 1)  # default anchor of the generated dates, so every run writes the same data
+
+def parse_count(text):
+    """'10k' -> 10000, '1M' -> 1000000, '2.5M' -> 2500000."""
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1].lower(), 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+def zipf_cum_weights(n, skew):
+    return list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(n)))
+
+def generate(db_path=DB_FILE, expenses=10_000, users=None, split_ratio=0.2, paid_ratio=0.5, goals_per_user=1.5,
+             months=24, skew=1.1, seed=0, batch_size=50_000, today=TODAY):
+    """Append synthetic data to db_path (migrating it first); returns the number of rows written per table."""
+    rng = random.Random(seed)
+    users = users or max(20, expenses // 500)
+    engine = db.create_engine(f"sqlite:///{db_path}")
+    migrate(engine)
+    names = [f"user{i:06d}" for i in range(users)]
+    cum_weights = zipf_cum_weights(users, skew)
+    total_weight = cum_weights[-1]
+    def pick_user(): return names[bisect.bisect(cum_weights, rng.random() * total_weight)]
+    counts = dict.fromkeys(["users", "expenses", "debts", "goals", "badges"], 0)
+
+    with engine.connect() as conn:
+        # Bulk load settings: this is a throwaway database, so durability is traded for load speed
+        conn.exec_driver_sql("PRAGMA journal_mode = WAL")
+        conn.exec_driver_sql("PRAGMA synchronous = OFF")
+        conn.commit()
+        password = make_hashes(PASSWORD)
+        conn.exec_driver_sql("INSERT INTO users (username, password) VALUES (?, ?) ON CONFLICT(username) DO NOTHING",
+                             [(name, password) for name in names])
+        counts["users"] = users
+        ids = dict(conn.execute(db.text("SELECT username, id FROM users")).all())
+        category_ids = dict(conn.execute(db.text("SELECT name, id FROM categories")).all())
+        next_id = conn.execute(db.text("SELECT COALESCE(MAX(id), 0) + 1 FROM expenses")).scalar()
+        days = months * 30
+        for offset in range(0, expenses, batch_size):
+            expense_rows, debt_rows = [], []
+            for expense_id in range(next_id + offset, next_id + min(offset + batch_size, expenses)):
+                username = pick_user()
+                category = rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0]
+                amount_cents = round(min(rng.lognormvariate(5.5, 1.0), 200_000) * 100)
+                expense_date = today - timedelta(days=int(days * rng.random() ** 1.5))  # biased towards recent days
+                expense_rows.append((expense_id, ids[username], expense_date.isoformat(), category_ids[category], amount_cents, f"{category} #{expense_id}"))
+                if rng.random() < split_ratio:
+                    friends = sorted({pick_user() for _ in range(rng.randint(1, 3))} - {username})
+                    shares = split_cents(amount_cents, len(friends) + 1)[1:]  # the first share is the payer's
+                    debt_rows += [(expense_id, ids[username], ids[friend], share, "paid" if rng.random() < paid_ratio else "unpaid")
+                                  for friend, share in zip(friends, shares)]
+            conn.exec_driver_sql("INSERT INTO expenses (id, user_id, expense_date, category_id, amount_cents, description) VALUES (?, ?, ?, ?, ?, ?)", expense_rows)
+            conn.exec_driver_sql("INSERT INTO debts (expense_id, payer_id, owes_id, amount_cents, status) VALUES (?, ?, ?, ?, ?)", debt_rows)
+            conn.commit()
+            counts["expenses"] += len(expense_rows); counts["debts"] += len(debt_rows)
+
+        goal_rows = []
+        for username in names:
+            for _ in range(rng.randint(0, math.ceil(2 * goals_per_user))):
+                target = rng.choice(GOAL_TARGETS)
+                goal_rows.append((username, f"Goal {len(goal_rows) + 1}", target, round(target * rng.random(), 2), ""))
+        conn.exec_driver_sql("INSERT INTO goals (username, goal_name, target_amount, current_amount, image_url) VALUES (?, ?, ?, ?, ?)", goal_rows)
+        counts["goals"] = len(goal_rows)
+
+        # Derived tables and badges are rebuilt exactly as the app would have maintained them
+        rebuild_monthly_rollup(conn); rebuild_debt_balances(conn); rebuild_user_stats(conn)
+        for badge_name, (counter, threshold) in BADGE_RULES.items():
+            counts["badges"] += conn.execute(db.text(f"""INSERT INTO badges (username, badge_name, date_unlocked)
+                                                         SELECT username, :badge, :today FROM user_stats WHERE {counter} >= :threshold
+                                                         ON CONFLICT(username, badge_name) DO NOTHING"""),
+                                             {"badge": badge_name, "today": today, "threshold": threshold}).rowcount
+        conn.commit()
+        conn.exec_driver_sql("ANALYZE")
+    engine.dispose()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--expenses", type=parse_count, default=10_000, help="e.g. 10k, 1M, 10M")
+    parser.add_argument("--users", type=parse_count, help="default: one user per 500 expenses, at least 20")
+    parser.add_argument("--split-ratio", type=float, default=0.2, help="share of expenses split with friends")
+    parser.add_argument("--paid-ratio", type=float, default=0.5, help="share of debts already settled")
+    parser.add_argument("--goals-per-user", type=float, default=1.5)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of activity per user")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--today", type=date.fromisoformat, default=TODAY, help=f"date the data ends on (default {TODAY})")
+    args = parser.parse_args()
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    start = time.perf_counter()
+    counts = generate(args.db, args.expenses, args.users, args.split_ratio, args.paid_ratio, args.goals_per_user,
+                      args.months, args.skew, args.seed, today=args.today)
+    print(json.dumps({"db": args.db, "seed": args.seed, "today": str(args.today), "rows": counts, "seconds": round(time.perf_counter() - start, 1)}, indent=2))
+
+if __name__ == "__main__":
+    main()
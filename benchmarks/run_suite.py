@@ -0,0 +1,67 @@
+"""Run the data and page-render benchmarks at several dataset sizes and save one JSON file per size.
+
+Datasets are generated once per size, seed and --today and reused by later runs, so results from different commits
+are measured against identical data. Results land in <out-dir>/<commit>_<size>.json; compare two of them with
+--compare. Run from the repository root:
+
+    python -m benchmarks.run_suite --sizes 10k 1M 10M
+    python -m benchmarks.run_suite --compare bench_results/abc1234_1M.json bench_results/def5678_1M.json
+"""
+import argparse
+import json
+import os
+from datetime import date
+
+from benchmarks.common import dataset, environment, save
+
+def run_size(size, data_dir, out_dir, seed, today, repeat, skip_render):
+    # These import the app, which --compare doesn't need
+    from benchmarks import bench_data, bench_render
+    from benchmarks.generate_data import TODAY, generate, parse_count
+    today = today or TODAY
+    db_path = os.path.join(data_dir, f"expenses_{size}_seed{seed}_{today}.db")
+    if not os.path.exists(db_path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"Generating {size} expenses into {db_path} ...", flush=True)
+        generate(db_path, expenses=parse_count(size), seed=seed, today=today)
+    results = {"environment": environment(), "size": size, "seed": seed, "dataset": {**dataset(db_path), "today": str(today)}}
+    print(f"Benchmarking data functions at {size} ...", flush=True)
+    results["benchmarks"] = bench_data.run(db_path, repeat)
+    if not skip_render:
+        print(f"Benchmarking page renders at {size} ...", flush=True)
+        results["renders"] = bench_render.run(db_path, max(1, repeat // 2))
+    save(results, os.path.join(out_dir, f"{results['environment']['commit']}_{size}.json"))
+
+def compare(baseline_path, candidate_path):
+    """Print the median time of every benchmark in both files and the candidate/baseline ratio."""
+    with open(baseline_path) as f: baseline = json.load(f)
+    with open(candidate_path) as f: candidate = json.load(f)
+    def medians(results):
+        flat = {name: stats["median_ms"] for name, stats in results.get("benchmarks", {}).items() if isinstance(stats, dict) and "median_ms" in stats}
+        for user, pages in results.get("renders", {}).items():
+            flat.update({f"render {user}: {page}": stats["median_ms"] for page, stats in pages.items()})
+        return flat
+    old, new = medians(baseline), medians(candidate)
+    print(f"{'benchmark':<55} {baseline['environment']['commit']:>12} {candidate['environment']['commit']:>12}   ratio")
+    for name in sorted(old.keys() & new.keys()):
+        ratio = new[name] / old[name] if old[name] else float("inf")
+        flag = "  slower" if ratio > 1.2 else "  faster" if ratio < 0.8 else ""
+        print(f"{name:<55} {old[name]:>10.2f}ms {new[name]:>10.2f}ms {ratio:>7.2f}x{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["10k", "1M", "10M"], help="expense rows per dataset")
+    parser.add_argument("--data-dir", default="bench_data")
+    parser.add_argument("--out-dir", default="bench_results")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--today", type=date.fromisoformat, help="date the generated data ends on (default: generate_data's)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-render", action="store_true")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"))
+    args = parser.parse_args()
+    if args.compare: return compare(*args.compare)
+    for size in args.sizes:
+        run_size(size, args.data_dir, args.out_dir, args.seed, args.today, args.repeat, args.skip_render)
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,553 @@
-import sqlite3
 import hashlib
+import os
+import re
+import sys
+import sqlalchemy as db
+
+DB_FILE = "expenses.db"
+DB_URL = os.environ.get("QUEST_DB_URL", f"sqlite:///{DB_FILE}")
+
+# --- DIALECTS ---
+# Queries stick to SQL that SQLite (3.35+) and PostgreSQL share: RETURNING, ON CONFLICT upserts and row
+# values. What still differs - column types and date functions - is written as {placeholders} that sql()
+# fills in for the connection's backend. The SQLite values reproduce the original DDL exactly.
+DIALECTS = {
+    "sqlite": {
+        "id_pk": "INTEGER PRIMARY KEY AUTOINCREMENT",
+        "small_pk": "INTEGER PRIMARY KEY AUTOINCREMENT",
+        "real": "REAL",
+        "expense_month": "strftime('%Y-%m', expense_date)",
+        # Full-text search: bm25 weights are per FTS column (description, category, username); lower is better
+        "search_from": "expenses_fts JOIN expenses e ON e.id = expenses_fts.rowid",
+        "search_match": "expenses_fts MATCH :query",
+        "search_rank": "bm25(expenses_fts, 10.0, 5.0, 0.0)",
+        "skip_locked": "",  # write transactions already run one at a time (BEGIN IMMEDIATE)
+    },
+    "postgresql": {
+        "id_pk": "BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY",
+        "small_pk": "SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY",
+        "real": "DOUBLE PRECISION",  # Postgres' REAL is single precision
+        "expense_month": "to_char(expense_date, 'YYYY-MM')",
+        "search_from": "expenses e",
+        "search_match": "e.search @@ to_tsquery('simple', :query)",
+        "search_rank": "-ts_rank(e.search, to_tsquery('simple', :query))",
+        "skip_locked": "FOR UPDATE SKIP LOCKED",  # concurrent writers each claim different rows
+    },
+}
+MIGRATION_LOCK_ID = 7274101  # arbitrary key for pg_advisory_xact_lock
+
+def sql(conn, statement):
+    """statement with its {placeholders} filled in for conn's database backend."""
+    return db.text(statement.format_map(DIALECTS[conn.dialect.name]))
+
+def search_query(conn, words, username=None):
+    """Full-text query, in conn's syntax, matching every word as a prefix of a description or category word.
+    On SQLite the username is matched inside the FTS index too, so one user's search never ranks everyone's rows."""
+    if conn.dialect.name == "postgresql": return " & ".join(f"{word}:*" for word in words)
+    terms = "{description category}: (" + " AND ".join(f'"{word}"*' for word in words) + ")"
+    if username is None: return terms
+    return 'username: "' + username.replace('"', '""') + '" AND ' + terms
+
+def create_search_index(conn):
+    """FTS5 table kept in sync by triggers on SQLite; a generated tsvector column with a GIN index on Postgres.
+    Written for the text-keyed expenses table of migration 7; recreate_search_index replaces it."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(db.text('''
+            ALTER TABLE expenses ADD COLUMN IF NOT EXISTS search tsvector GENERATED ALWAYS AS
+                (setweight(to_tsvector('simple', coalesce(description, '')), 'A') || setweight(to_tsvector('simple', category), 'B')) STORED
+        '''))
+        conn.execute(db.text("CREATE INDEX IF NOT EXISTS idx_expenses_search ON expenses USING GIN (search)"))
+        return
+    # External-content table: the text lives only in expenses, the FTS table holds just the index.
+    # prefix='2 3' adds prefix indexes so short "lun*"-style queries don't scan the whole term list.
+    for statement in [
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(description, category, username,
+               content='expenses', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')''',
+        '''CREATE TRIGGER IF NOT EXISTS expenses_fts_insert AFTER INSERT ON expenses BEGIN
+               INSERT INTO expenses_fts(rowid, description, category, username) VALUES (new.id, new.description, new.category, new.username);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS expenses_fts_delete AFTER DELETE ON expenses BEGIN
+               INSERT INTO expenses_fts(expenses_fts, rowid, description, category, username) VALUES ('delete', old.id, old.description, old.category, old.username);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS expenses_fts_update AFTER UPDATE OF description, category, username ON expenses BEGIN
+               INSERT INTO expenses_fts(expenses_fts, rowid, description, category, username) VALUES ('delete', old.id, old.description, old.category, old.username);
+               INSERT INTO expenses_fts(rowid, description, category, username) VALUES (new.id, new.description, new.category, new.username);
+           END''',
+        "INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')",
+    ]: conn.exec_driver_sql(statement)
+
+def recreate_search_index(conn):
+    """Search index for the dictionary-encoded expenses table. Category and user names live in their lookup
+    tables, so the triggers (and on SQLite, a view for FTS5's 'rebuild') join them in."""
+    if conn.dialect.name == "postgresql":
+        # A generated column can't read another table, so a trigger fills in the category's name
+        for statement in [
+            "ALTER TABLE expenses ADD COLUMN IF NOT EXISTS search tsvector",
+            '''CREATE OR REPLACE FUNCTION expenses_search_vector() RETURNS trigger AS $$ BEGIN
+                   NEW.search := setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'A')
+                              || setweight(to_tsvector('simple', (SELECT name FROM categories WHERE id = NEW.category_id)), 'B');
+                   RETURN NEW;
+               END $$ LANGUAGE plpgsql''',
+            '''CREATE OR REPLACE TRIGGER expenses_search_vector BEFORE INSERT OR UPDATE OF description, category_id ON expenses
+               FOR EACH ROW EXECUTE FUNCTION expenses_search_vector()''',
+            '''UPDATE expenses e SET search = setweight(to_tsvector('simple', coalesce(e.description, '')), 'A')
+                                            || setweight(to_tsvector('simple', c.name), 'B')
+               FROM categories c WHERE c.id = e.category_id''',
+            "CREATE INDEX IF NOT EXISTS idx_expenses_search ON expenses USING GIN (search)",
+        ]: conn.exec_driver_sql(statement)
+        return
+    names = "FROM categories c, users u WHERE c.id = {row}.category_id AND u.id = {row}.user_id"
+    for statement in [
+        "DROP TABLE IF EXISTS expenses_fts",
+        '''CREATE VIEW IF NOT EXISTS expenses_search AS
+               SELECT e.id, e.description, c.name AS category, u.username FROM expenses e
+               JOIN categories c ON c.id = e.category_id JOIN users u ON u.id = e.user_id''',
+        '''CREATE VIRTUAL TABLE expenses_fts USING fts5(description, category, username,
+               content='expenses_search', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')''',
+        f'''CREATE TRIGGER IF NOT EXISTS expenses_fts_insert AFTER INSERT ON expenses BEGIN
+               INSERT INTO expenses_fts(rowid, description, category, username) SELECT new.id, new.description, c.name, u.username {names.format(row="new")};
+           END''',
+        f'''CREATE TRIGGER IF NOT EXISTS expenses_fts_delete AFTER DELETE ON expenses BEGIN
+               INSERT INTO expenses_fts(expenses_fts, rowid, description, category, username) SELECT 'delete', old.id, old.description, c.name, u.username {names.format(row="old")};
+           END''',
+        f'''CREATE TRIGGER IF NOT EXISTS expenses_fts_update AFTER UPDATE OF description, category_id, user_id ON expenses BEGIN
+               INSERT INTO expenses_fts(expenses_fts, rowid, description, category, username) SELECT 'delete', old.id, old.description, c.name, u.username {names.format(row="old")};
+               INSERT INTO expenses_fts(rowid, description, category, username) SELECT new.id, new.description, c.name, u.username {names.format(row="new")};
+           END''',
+        "INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')",
+    ]: conn.exec_driver_sql(statement)
+
+def add_user_ids(conn):
+    """Give users a small integer id for other tables to reference; username stays unique."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(db.text("ALTER TABLE users ADD COLUMN IF NOT EXISTS id INTEGER GENERATED BY DEFAULT AS IDENTITY UNIQUE"))
+        return
+    # SQLite can't add a unique or auto-numbered column in place, so the table is copied
+    for statement in [
+        "CREATE TABLE users_v8 (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL UNIQUE, password TEXT NOT NULL)",
+        "INSERT INTO users_v8 (username, password) SELECT username, password FROM users ORDER BY rowid",
+        "DROP TABLE users",
+        "ALTER TABLE users_v8 RENAME TO users",
+    ]: conn.exec_driver_sql(statement)
+
+def add_missing_users(conn):
+    """Create a users row for every username the ledger refers to without one (SQLite never enforced those foreign
+    keys), so the copies in migration 8 keep their rows. The password '!' matches no hash, so nobody can log in."""
+    conn.execute(db.text("""INSERT INTO users (username, password)
+                            SELECT username, '!' FROM (SELECT username FROM expenses UNION SELECT payer_username FROM debts
+                                                       UNION SELECT owes_username FROM debts) AS referenced
+                            WHERE username NOT IN (SELECT username FROM users)"""))
+
+def check_copied(source, copy):
+    """Migration step that aborts the migration unless every row of source made it into copy."""
+    def check(conn):
+        rows, copied = (conn.execute(db.text(f"SELECT COUNT(*) FROM {table}")).scalar() for table in (source, copy))
+        if rows != copied: raise RuntimeError(f"only {copied} of {rows} rows of {source} could be copied; the database was left unchanged")
+    return check
+
+def reset_id_sequences(conn, *tables):
+    """After rows were copied in with their ids, make Postgres' identity columns continue after them."""
+    if conn.dialect.name != "postgresql": return  # SQLite's AUTOINCREMENT already tracks the largest id
+    for table in tables:
+        conn.execute(db.text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"))
+
+def lock_for_migration(conn):
+    """Serialise schema changes when several app processes or replicas start at once."""
+    if conn.dialect.name == "sqlite":
+        if not conn.connection.dbapi_connection.in_transaction: conn.exec_driver_sql("BEGIN IMMEDIATE")
+    elif conn.dialect.name == "postgresql":
+        conn.execute(db.text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_ID})
 
 def make_hashes(password):
     return hashlib.sha256(str.encode(password)).hexdigest()
 
-conn = sqlite3.connect('expenses.db')
-c = conn.cursor()
-
-# --- 1. Users Table ---
-c.execute('''
-CREATE TABLE IF NOT EXISTS users (
-    username TEXT PRIMARY KEY,
-    password TEXT NOT NULL
-)
-''')
-
-# --- 2. Expenses Table ---
-c.execute('''
-CREATE TABLE IF NOT EXISTS expenses (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT NOT NULL,
-    expense_date DATE NOT NULL,
-    category TEXT NOT NULL,
-    amount REAL NOT NULL,
-    description TEXT,
-    FOREIGN KEY (username) REFERENCES users (username)
-)
-''')
-
-# --- 3. Goals Table ---
-c.execute('''
-CREATE TABLE IF NOT EXISTS goals (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT NOT NULL,
-    goal_name TEXT NOT NULL,
-    target_amount REAL NOT NULL,
-    current_amount REAL DEFAULT 0,
-    image_url TEXT,
-    FOREIGN KEY (username) REFERENCES users (username)
-)
-''')
-
-# --- 4. Badges Table ---
-c.execute('''
-CREATE TABLE IF NOT EXISTS badges (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT NOT NULL,
-    badge_name TEXT NOT NULL,
-    date_unlocked DATE NOT NULL,
-    UNIQUE(username, badge_name),
-    FOREIGN KEY (username) REFERENCES users (username)
-)
-''')
-
-# --- 5. Debts Table (REQUIRED FOR SPLIT BILL) ---
-c.execute('''
-CREATE TABLE IF NOT EXISTS debts (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    expense_id INTEGER NOT NULL,
-    payer_username TEXT NOT NULL,
-    owes_username TEXT NOT NULL,
-    amount REAL NOT NULL,
-    status TEXT DEFAULT 'unpaid',
-    FOREIGN KEY (expense_id) REFERENCES expenses (id),
-    FOREIGN KEY (payer_username) REFERENCES users (username),
-    FOREIGN KEY (owes_username) REFERENCES users (username)
-)
-''')
-
-# Add default users
-try:
-    c.execute("INSERT INTO users (username, password) VALUES (?, ?)",
-              ('Itachibanker19', make_hashes('Killer1980')))
-    c.execute("INSERT INTO users (username, password) VALUES (?, ?)",
-              ('demo', make_hashes('demo123')))
-except sqlite3.IntegrityError:
-    print("Default users already exist.")
-
-conn.commit()
-conn.close()
-print("✅ Database updated with ALL tables (Users, Expenses, Goals, Badges, Debts).")
+def rebuild_monthly_rollup(conn):
+    """Recompute monthly_rollup from scratch, e.g. after importing expenses with plain SQL."""
+    conn.execute(db.text("DELETE FROM monthly_rollup"))
+    conn.execute(sql(conn, '''
+        INSERT INTO monthly_rollup (user_id, month, category_id, total_cents, expense_count)
+        SELECT user_id, {expense_month}, category_id, SUM(amount_cents), COUNT(*)
+        FROM expenses GROUP BY 1, 2, 3
+    '''))
+
+def rebuild_debt_balances(conn):
+    """Recompute the per-pair net balances from unpaid debts."""
+    conn.execute(db.text("DELETE FROM debt_balances"))
+    conn.execute(db.text('''
+        INSERT INTO debt_balances (user_a, user_b, amount_cents)
+        SELECT CASE WHEN payer_id < owes_id THEN payer_id ELSE owes_id END,
+               CASE WHEN payer_id < owes_id THEN owes_id ELSE payer_id END,
+               SUM(CASE WHEN payer_id < owes_id THEN amount_cents ELSE -amount_cents END)
+        FROM debts WHERE status = 'unpaid' GROUP BY 1, 2
+    '''))
+
+def rebuild_user_stats(conn):
+    """Recompute the per-user badge counters from expenses and goals."""
+    conn.execute(db.text("DELETE FROM user_stats"))
+    conn.execute(db.text('''
+        INSERT INTO user_stats (username, expense_count, goal_count, total_saved)
+        SELECT u.username, COALESCE(e.n, 0), COALESCE(g.n, 0), COALESCE(g.saved, 0)
+        FROM users u
+        LEFT JOIN (SELECT user_id, COUNT(*) AS n FROM expenses GROUP BY user_id) e ON e.user_id = u.id
+        LEFT JOIN (SELECT username, COUNT(*) AS n, SUM(current_amount) AS saved FROM goals GROUP BY username) g ON g.username = u.username
+    '''))
+
+def seed_default_users(conn):
+    for username, password in [('Itachibanker19', 'Killer1980'), ('demo', 'demo123')]:
+        conn.execute(db.text("INSERT INTO users (username, password) VALUES (:user, :pass) ON CONFLICT(username) DO NOTHING"),
+                     {"user": username, "pass": make_hashes(password)})
+
+# --- MIGRATIONS ---
+# Each migration is (version, description, steps); a step is a SQL string or a callable taking the connection.
+# Versions are applied in order, each in its own transaction, and recorded in schema_version, so an existing
+# expenses.db is upgraded in place. Never edit a migration that has shipped - append a new one instead.
+MIGRATIONS = [
+    (1, "Base tables (Users, Expenses, Goals, Badges, Debts, User Stats)", [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS expenses (
+            id {id_pk},
+            username TEXT NOT NULL,
+            expense_date DATE NOT NULL,
+            category TEXT NOT NULL,
+            amount {real} NOT NULL,
+            description TEXT,
+            FOREIGN KEY (username) REFERENCES users (username)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS goals (
+            id {id_pk},
+            username TEXT NOT NULL,
+            goal_name TEXT NOT NULL,
+            target_amount {real} NOT NULL,
+            current_amount {real} DEFAULT 0,
+            image_url TEXT,
+            FOREIGN KEY (username) REFERENCES users (username)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS badges (
+            id {id_pk},
+            username TEXT NOT NULL,
+            badge_name TEXT NOT NULL,
+            date_unlocked DATE NOT NULL,
+            UNIQUE(username, badge_name),
+            FOREIGN KEY (username) REFERENCES users (username)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS debts (
+            id {id_pk},
+            expense_id INTEGER NOT NULL,
+            payer_username TEXT NOT NULL,
+            owes_username TEXT NOT NULL,
+            amount {real} NOT NULL,
+            status TEXT DEFAULT 'unpaid',
+            FOREIGN KEY (expense_id) REFERENCES expenses (id),
+            FOREIGN KEY (payer_username) REFERENCES users (username),
+            FOREIGN KEY (owes_username) REFERENCES users (username)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_stats (
+            username TEXT PRIMARY KEY,
+            expense_count INTEGER NOT NULL DEFAULT 0,
+            goal_count INTEGER NOT NULL DEFAULT 0,
+            total_saved {real} NOT NULL DEFAULT 0,
+            FOREIGN KEY (username) REFERENCES users (username)
+        )
+        ''',
+        # Backfill counters for databases created before user_stats existed
+        '''
+        INSERT INTO user_stats (username, expense_count, goal_count, total_saved)
+        SELECT u.username,
+               (SELECT COUNT(*) FROM expenses e WHERE e.username = u.username),
+               (SELECT COUNT(*) FROM goals g WHERE g.username = u.username),
+               (SELECT COALESCE(SUM(g.current_amount), 0) FROM goals g WHERE g.username = u.username)
+        FROM users u WHERE true
+        ON CONFLICT(username) DO NOTHING
+        ''',
+        seed_default_users,
+    ]),
+    (2, "Indexes for per-user, debt and goal lookups", [
+        # (username, expense_date) drives the per-user listing; amount makes it covering for monthly totals
+        "CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses (username, expense_date, amount)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_user_category ON expenses (username, category, amount)",
+        # Company-wide (admin) aggregations scan these narrow covering indexes instead of the table
+        "CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses (category, amount)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (expense_date, amount)",
+        "CREATE INDEX IF NOT EXISTS idx_debts_owes_status ON debts (owes_username, status, payer_username, amount)",
+        "CREATE INDEX IF NOT EXISTS idx_debts_payer_status ON debts (payer_username, status, owes_username, amount)",
+        "CREATE INDEX IF NOT EXISTS idx_debts_expense ON debts (expense_id)",
+        "CREATE INDEX IF NOT EXISTS idx_goals_user ON goals (username)",
+        # badges.username is already covered by the UNIQUE(username, badge_name) index
+    ]),
+    (3, "Keyset pagination indexes on (expense_date, id)", [
+        # Ordered by (expense_date, id) for ORDER BY ... DESC LIMIT pages; amount keeps them covering for monthly totals
+        "DROP INDEX IF EXISTS idx_expenses_user_date",
+        "DROP INDEX IF EXISTS idx_expenses_date",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_user_date_id ON expenses (username, expense_date, id, amount)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_date_id ON expenses (expense_date, id, amount)",
+    ]),
+    (4, "Per-user monthly rollup of spending by category", [
+        '''
+        CREATE TABLE IF NOT EXISTS monthly_rollup (
+            username TEXT NOT NULL,
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            total {real} NOT NULL DEFAULT 0,
+            expense_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, month, category)
+        )
+        ''',
+        # Company-wide charts read these instead of scanning the per-user primary key
+        "CREATE INDEX IF NOT EXISTS idx_rollup_month ON monthly_rollup (month, total)",
+        "CREATE INDEX IF NOT EXISTS idx_rollup_category ON monthly_rollup (category, total)",
+        # Totals no longer aggregate expenses directly
+        "DROP INDEX IF EXISTS idx_expenses_user_category",
+        "DROP INDEX IF EXISTS idx_expenses_category",
+        # Inlined rather than rebuild_monthly_rollup(), which follows the current (migration 8) layout
+        "DELETE FROM monthly_rollup",
+        "INSERT INTO monthly_rollup (username, month, category, total, expense_count) SELECT username, {expense_month}, category, SUM(amount), COUNT(*) FROM expenses GROUP BY 1, 2, 3",
+    ]),
+    (5, "Net debt balance per pair of users", [
+        '''
+        CREATE TABLE IF NOT EXISTS debt_balances (
+            user_a TEXT NOT NULL,
+            user_b TEXT NOT NULL,
+            amount {real} NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_a, user_b),
+            CHECK (user_a < user_b)
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_debt_balances_b ON debt_balances (user_b, user_a, amount)",
+        # Inlined rather than rebuild_debt_balances(), which follows the current (migration 8) layout
+        "DELETE FROM debt_balances",
+        '''
+        INSERT INTO debt_balances (user_a, user_b, amount)
+        SELECT CASE WHEN payer_username < owes_username THEN payer_username ELSE owes_username END,
+               CASE WHEN payer_username < owes_username THEN owes_username ELSE payer_username END,
+               SUM(CASE WHEN payer_username < owes_username THEN amount ELSE -amount END)
+        FROM debts WHERE status = 'unpaid' GROUP BY 1, 2
+        ''',
+    ]),
+    (6, "Background jobs (exports, insights, rollup rebuilds)", [
+        # params is the job's arguments as sorted JSON; data_version identifies the data the result was
+        # computed from, so an identical request made before that data changes reuses the job
+        '''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id {id_pk},
+            kind TEXT NOT NULL,
+            username TEXT NOT NULL,
+            params TEXT NOT NULL,
+            data_version TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            progress {real} NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES users (username)
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_jobs_lookup ON jobs (username, kind, params, data_version)",
+    ]),
+    (7, "Full-text search over expense descriptions and categories", [create_search_index]),
+    (8, "Integer cents and dictionary-encoded users and categories in the ledger tables", [
+        add_missing_users,
+        add_user_ids,
+        '''
+        CREATE TABLE IF NOT EXISTS categories (
+            id {small_pk},
+            name TEXT NOT NULL UNIQUE
+        )
+        ''',
+        "INSERT INTO categories (name) VALUES ('Food'), ('Transport'), ('Shopping'), ('Bills'), ('Entertainment'), ('Other')",
+        "INSERT INTO categories (name) SELECT DISTINCT category FROM expenses WHERE true ON CONFLICT(name) DO NOTHING",
+        # expenses and debts are copied into their new layout, keeping their ids; amounts were stored with
+        # two decimals, so rounding amount * 100 recovers the exact cents
+        "DROP TABLE IF EXISTS expenses_fts",
+        '''
+        CREATE TABLE expenses_v8 (
+            id {id_pk},
+            user_id INTEGER NOT NULL,
+            expense_date DATE NOT NULL,
+            category_id SMALLINT NOT NULL,
+            amount_cents BIGINT NOT NULL,
+            description TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+        )
+        ''',
+        '''
+        INSERT INTO expenses_v8 (id, user_id, expense_date, category_id, amount_cents, description)
+        SELECT e.id, u.id, e.expense_date, c.id, CAST(ROUND(e.amount * 100) AS BIGINT), e.description
+        FROM expenses e JOIN users u ON u.username = e.username JOIN categories c ON c.name = e.category
+        ''',
+        check_copied("expenses", "expenses_v8"),
+        '''
+        CREATE TABLE debts_v8 (
+            id {id_pk},
+            expense_id INTEGER NOT NULL,
+            payer_id INTEGER NOT NULL,
+            owes_id INTEGER NOT NULL,
+            amount_cents BIGINT NOT NULL,
+            status TEXT DEFAULT 'unpaid',
+            FOREIGN KEY (expense_id) REFERENCES expenses_v8 (id),
+            FOREIGN KEY (payer_id) REFERENCES users (id),
+            FOREIGN KEY (owes_id) REFERENCES users (id)
+        )
+        ''',
+        '''
+        INSERT INTO debts_v8 (id, expense_id, payer_id, owes_id, amount_cents, status)
+        SELECT d.id, d.expense_id, p.id, o.id, CAST(ROUND(d.amount * 100) AS BIGINT), d.status
+        FROM debts d JOIN users p ON p.username = d.payer_username JOIN users o ON o.username = d.owes_username
+        ''',
+        check_copied("debts", "debts_v8"),
+        "DROP TABLE debts",
+        "DROP TABLE expenses",
+        "ALTER TABLE expenses_v8 RENAME TO expenses",
+        "ALTER TABLE debts_v8 RENAME TO debts",
+        lambda conn: reset_id_sequences(conn, "expenses", "debts"),
+        "CREATE INDEX IF NOT EXISTS idx_expenses_user_date_id ON expenses (user_id, expense_date, id, amount_cents)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_date_id ON expenses (expense_date, id, amount_cents)",
+        "CREATE INDEX IF NOT EXISTS idx_debts_owes_status ON debts (owes_id, status, payer_id, amount_cents)",
+        "CREATE INDEX IF NOT EXISTS idx_debts_payer_status ON debts (payer_id, status, owes_id, amount_cents)",
+        "CREATE INDEX IF NOT EXISTS idx_debts_expense ON debts (expense_id)",
+        # The running totals are derived data, so they are recreated in the new layout and rebuilt
+        "DROP TABLE monthly_rollup",
+        '''
+        CREATE TABLE monthly_rollup (
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            category_id SMALLINT NOT NULL,
+            total_cents BIGINT NOT NULL DEFAULT 0,
+            expense_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, month, category_id)
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_rollup_month ON monthly_rollup (month, total_cents)",
+        "CREATE INDEX IF NOT EXISTS idx_rollup_category ON monthly_rollup (category_id, total_cents)",
+        rebuild_monthly_rollup,
+        "DROP TABLE debt_balances",
+        '''
+        CREATE TABLE debt_balances (
+            user_a INTEGER NOT NULL,
+            user_b INTEGER NOT NULL,
+            amount_cents BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_a, user_b),
+            CHECK (user_a < user_b)
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_debt_balances_b ON debt_balances (user_b, user_a, amount_cents)",
+        rebuild_debt_balances,
+        recreate_search_index,
+    ]),
+    (9, "Recurring expense rules and monthly budgets per category", [
+        # next_date is the first occurrence not yet added to expenses (NULL once the rule has ended) and
+        # occurrences counts those added, so each catch-up run continues where the last one stopped.
+        # split_with is a JSON list of user ids.
+        '''
+        CREATE TABLE IF NOT EXISTS recurring_rules (
+            id {id_pk},
+            user_id INTEGER NOT NULL,
+            category_id SMALLINT NOT NULL,
+            amount_cents BIGINT NOT NULL,
+            description TEXT,
+            split_with TEXT NOT NULL DEFAULT '[]',
+            frequency TEXT NOT NULL,
+            start_date DATE NOT NULL,
+            end_date DATE,
+            occurrences INTEGER NOT NULL DEFAULT 0,
+            next_date DATE,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_recurring_due ON recurring_rules (next_date)",
+        "CREATE INDEX IF NOT EXISTS idx_recurring_user ON recurring_rules (user_id, next_date)",
+        # Spending to check budgets against comes from monthly_rollup
+        '''
+        CREATE TABLE IF NOT EXISTS budgets (
+            user_id INTEGER NOT NULL,
+            category_id SMALLINT NOT NULL,
+            limit_cents BIGINT NOT NULL,
+            PRIMARY KEY (user_id, category_id),
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+        )
+        ''',
+    ]),
+    (10, "Job heartbeats, to spot jobs that stopped without finishing", [
+        # Seconds since the epoch of the job's last sign of life: queued, claimed or progress written
+        "ALTER TABLE jobs ADD COLUMN heartbeat {real}",
+    ]),
+]
+
+def get_schema_version(conn):
+    conn.execute(db.text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, description TEXT, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"))
+    return conn.execute(db.text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+def migrate(engine):
+    """Apply all pending migrations; safe to call from several processes at once. Returns the applied versions."""
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        with engine.begin() as conn:
+            # Take the lock before reading the version so two workers can't apply the same migration
+            lock_for_migration(conn)
+            if get_schema_version(conn) >= version: continue
+            for step in steps:
+                if callable(step): step(conn)
+                else: conn.execute(sql(conn, step))
+            conn.execute(db.text("INSERT INTO schema_version (version, description) VALUES (:v, :d)"), {"v": version, "d": description})
+            applied.append(version)
+    return applied
+
+# --- QUERY PLAN CHECK ---
+# The statements checked are the ones the app actually ran, recorded by a before_cursor_execute hook while the
+# tests exercise it (see tests/test_backends.py), so every variant a caller produces is covered. Each must find
+# its rows through an index: a SCAN reads the whole table, even when it only reads a covering index. FULL_SCANS
+# lists the statements that read every row on purpose, e.g. the admin's unfiltered company-wide views.
+FULL_SCANS = [
+    re.compile(r"SELECT (name|COUNT\(\*\)) FROM categories( ORDER BY id)?$"),  # at most MAX_CATEGORIES rows
+    re.compile(r"SELECT username FROM users WHERE username != \?$"),  # everyone a bill can be split with
+    re.compile(r"SELECT id, user_id, expense_date, category_id, amount_cents, description FROM expenses$"),  # the admin's view_all_expenses
+    re.compile(r"SELECT (?!.*\bWHERE\b).* FROM expenses\b.* ORDER BY .* LIMIT \?$"),  # first page or chunk of the admin's listing and export
+    re.compile(r"SELECT .* FROM monthly_rollup GROUP BY \w+( ORDER BY \w+)?$"),  # the admin's totals
+]
+
+def full_scans(details):
+    """The steps of an EXPLAIN QUERY PLAN that read a whole table; an FTS5 MATCH (an idxStr after the colon) doesn't."""
+    return [d for d in details if d.startswith("SCAN") and not re.search(r"CONSTANT ROW|VIRTUAL TABLE INDEX \d+:\S", d)]
+
+def check_query_plans(conn, statements):
+    """{statement: plan details} for the (statement, parameters) pairs, as the SQLite driver received them, whose
+    plan scans a whole table and which FULL_SCANS doesn't allow. Postgres' planner picks sequential scans for
+    small tables regardless of indexes, so this is SQLite only."""
+    problems = {}
+    for statement, parameters in statements:
+        if not re.match(r"\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", statement, re.I): continue
+        flat = " ".join(statement.split())
+        if any(pattern.match(flat) for pattern in FULL_SCANS): continue
+        details = full_scans([row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)])
+        if details: problems[flat] = details
+    return problems
+
+if __name__ == '__main__':
+    engine = db.create_engine(DB_URL)
+    applied = migrate(engine)
+    print(f"✅ Database at schema version {MIGRATIONS[-1][0]}" + (f" (applied {applied})." if applied else " (already up to date)."))
+    if "--rebuild-rollups" in sys.argv:
+        with engine.begin() as conn:
+            rebuild_monthly_rollup(conn); rebuild_debt_balances(conn); rebuild_user_stats(conn)
+        print("✅ Rebuilt monthly_rollup, debt_balances and user_stats.")
+    if "--vacuum" in sys.argv and engine.dialect.name == "sqlite":
+        # Tables copied by a migration leave their old pages free inside the file until it is rewritten
+        with engine.connect() as conn: conn.exec_driver_sql("VACUUM")
+        print("✅ Compacted the database file.")